@@ -1,14 +1,20 @@
 import argparse
+import functools
+import hashlib
 import json
 import logging
 import os
 import platform
 import re
+import shutil
 import sys
+import tempfile
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 try:
     import requests  # type: ignore
@@ -16,9 +22,9 @@ except Exception:  # pragma: no cover
     requests = None  # type: ignore
 
 try:
-    import jsonschema  # type: ignore
+    import orjson  # type: ignore
 except Exception:  # pragma: no cover
-    jsonschema = None  # type: ignore
+    orjson = None  # type: ignore
 
 __author__ = "Matt Lowe"
 __email__ = "marl.scot.1@googlemail.com"
@@ -26,12 +32,29 @@ __version__ = "1.1.2"
 __license__ = "MIT"
 
 
-HOST_LINE_RE = re.compile(r"^Host\s+(?P<patterns>.+)$", re.IGNORECASE)
-KV_RE = re.compile(r"^(?P<key>\w+)\s+(?P<value>.+)$")
+HOST_LINE_RE = re.compile(r"^[ \t]*Host[ \t]+(?P<patterns>[^\n]*\S)", re.IGNORECASE | re.MULTILINE)
+KV_RE = re.compile(r"^[ \t]*(?P<key>\w+)[ \t]+(?P<value>[^\n]*\S)", re.MULTILINE)
 SUPPORTED_KEYS = {"hostname", "user", "port", "identityfile"}
-
-
-@dataclass
+# Canonical key for each supported key, including the usual ssh_config spellings so they need no .lower()
+SUPPORTED_KEY_MAP = {k: k for k in SUPPORTED_KEYS}
+SUPPORTED_KEY_MAP.update({"HostName": "hostname", "User": "user", "Port": "port", "IdentityFile": "identityfile"})
+HOST_LINE_BYTES_RE = re.compile(rb"^[ \t]*Host[ \t]+\S", re.IGNORECASE | re.MULTILINE)
+SNIFF_BYTES = 64 * 1024
+MAX_CONFIG_BYTES = 1024 * 1024  # real ssh configs are tiny; anything bigger is a key dump, log, etc.
+# Directories never worth descending into when scanning for configs
+SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", ".cache"}
+LEADING_SPACES_RE = re.compile(rb"^( +)", re.MULTILINE)
+GUID_NAMESPACE = uuid.UUID("12345678-1234-5678-1234-567812345678")
+SCHEMA_CACHE_DIR = Path(tempfile.gettempdir()) / "ssh_to_terminal_schema_cache"
+SCHEMA_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # seconds
+
+# Validators built from fetched schemas, keyed by schema URL, reused for the life of the process
+_VALIDATOR_CACHE: Dict[str, object] = {}
+_SESSION = None
+
+
+# Frozen so the cached commandline can never go stale; cached_property writes to __dict__ directly
+@dataclass(frozen=True)
 class SshHost:
     name: str
     hostname: Optional[str] = None
@@ -39,7 +62,7 @@ class SshHost:
     port: Optional[str] = None
     identity_file: Optional[str] = None
 
-    @property
+    @functools.cached_property
     def commandline(self) -> str:
         parts: List[str] = ["ssh"]
         if self.port:
@@ -54,67 +77,140 @@ class SshHost:
 
     def guid(self) -> str:
         # Deterministic GUID so updates overwrite the same profile consistently
-        ns = uuid.UUID("12345678-1234-5678-1234-567812345678")
-        return str(uuid.uuid5(ns, f"ssh-to-terminal:{self.name}"))
+        return _guid_for_name(self.name)
+
+
+def _guid_for_name(name: str) -> str:
+    return str(uuid.uuid5(GUID_NAMESPACE, f"ssh-to-terminal:{name}"))
 
 
+@functools.lru_cache(maxsize=1)
 def find_default_settings_path() -> Path:
-    # Windows native
+    # Windows native: the answer is fully determined by LOCALAPPDATA, never probe the WSL paths
     if os.name == "nt":
-        local_app = os.environ.get("LOCALAPPDATA")
-        if local_app:
-            return Path(local_app) / "Packages" / "Microsoft.WindowsTerminal_8wekyb3d8bbwe" / "LocalState" / "settings.json"
+        local_app = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+        return Path(local_app) / "Packages" / "Microsoft.WindowsTerminal_8wekyb3d8bbwe" / "LocalState" / "settings.json"
     # WSL / POSIX: try to resolve Windows user profile mounted under /mnt/c
     user = os.environ.get("USERNAME") or os.environ.get("USER") or os.getlogin()
+    # Probe plain strings with os.path.exists and only build a Path for the result
     candidates = [
-        Path(f"/mnt/c/Users/{user}/AppData/Local/Packages/Microsoft.WindowsTerminal_8wekyb3d8bbwe/LocalState/settings.json"),
-        Path.home() / "AppData/Local/Packages/Microsoft.WindowsTerminal_8wekyb3d8bbwe/LocalState/settings.json",
+        f"/mnt/c/Users/{user}/AppData/Local/Packages/Microsoft.WindowsTerminal_8wekyb3d8bbwe/LocalState/settings.json",
+        os.path.join(os.path.expanduser("~"), "AppData/Local/Packages/Microsoft.WindowsTerminal_8wekyb3d8bbwe/LocalState/settings.json"),
     ]
-    for p in candidates:
-        if p.exists():
-            return p
+    for s in candidates:
+        if os.path.exists(s):
+            return Path(s)
     # Fallback to typical Windows path under mounted C drive
-    return candidates[0]
+    return Path(candidates[0])
 
 
-def discover_ssh_config_files(ssh_dir: Path, include_subdirs: bool, excludes: Iterable[str]) -> List[Path]:
+def iter_candidate_files(
+    ssh_dir: Path,
+    include_subdirs: bool,
+    excludes: Iterable[str],
+    skip_dirs: Iterable[str] = (),
+    skip_hidden: bool = False,
+) -> Iterator[Path]:
     exclude_names = {os.path.basename(e) for e in excludes}
-    files: List[Path] = []
-    if include_subdirs:
-        for p in ssh_dir.rglob("*"):
-            if p.is_file() and p.name not in exclude_names and looks_like_ssh_config(p):
-                files.append(p)
+    skip_names = SKIP_DIRS | {os.path.basename(d.rstrip("/\\")) for d in skip_dirs}
+    # Walk with os.scandir so is_file()/is_dir() reuse the DirEntry metadata instead of
+    # issuing an extra stat() per entry as Path.rglob + Path.is_file would.
+    stack: List[str] = [str(ssh_dir)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # prune whole subtrees here rather than filtering what they yield
+                        if include_subdirs and entry.name not in skip_names and not (skip_hidden and entry.name.startswith(".")):
+                            stack.append(entry.path)
+                        continue
+                    # the name check is free, so do it before anything that may stat
+                    if entry.name in exclude_names:
+                        continue
+                    # follow symlinks here so a linked ~/.ssh/config is still picked up
+                    if not entry.is_file():
+                        continue
+                    # DirEntry caches this stat (free on Windows), and it saves opening empty or oversized files
+                    size = entry.stat().st_size
+                    if size == 0 or size > MAX_CONFIG_BYTES:
+                        logging.debug(f"{entry.path}: skipped, size {size} bytes is outside 1..{MAX_CONFIG_BYTES}")
+                        continue
+                except OSError:
+                    continue
+                yield Path(entry.path)
+
+
+def scan_and_parse(
+    ssh_dir: Path,
+    include_subdirs: bool,
+    excludes: Iterable[str],
+    skip_dirs: Iterable[str] = (),
+    skip_hidden: bool = False,
+) -> List[Tuple[Path, List[SshHost]]]:
+    # Single pass: every candidate is opened once and parsed directly, with no separate sniffing read.
+    # Parsing is I/O bound, so reads are overlapped on a small thread pool; map() keeps the walk order.
+    candidates = list(iter_candidate_files(ssh_dir, include_subdirs, excludes, skip_dirs, skip_hidden))
+    if len(candidates) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as ex:
+            parsed = list(ex.map(_parse_candidate, candidates))
     else:
-        if ssh_dir.exists():
-            for p in ssh_dir.iterdir():
-                if p.is_file() and p.name not in exclude_names and looks_like_ssh_config(p):
-                    files.append(p)
-    return files
+        parsed = [_parse_candidate(p) for p in candidates]
+
+    results: List[Tuple[Path, List[SshHost]]] = []
+    for path, outcome in zip(candidates, parsed):
+        if outcome is None:
+            continue
+        hosts, saw_host_line = outcome
+        if not saw_host_line:
+            logging.debug(f"{path}: no ssh content")
+            continue
+        results.append((path, hosts))
+    return results
 
 
-def looks_like_ssh_config(path: Path) -> bool:
+def _parse_candidate(path: Path) -> Optional[Tuple[List[SshHost], bool]]:
     try:
-        with path.open("r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                if HOST_LINE_RE.match(line.rstrip("\n")):
-                    return True
-    except Exception:
-        return False
-    return False
+        return parse_ssh_config(path)
+    except Exception as ex:
+        logging.warning(f"Failed to parse {path}: {ex}")
+        return None
+
+
+def _read_supported_keys(text: str, pos: int, endpos: int, block: Dict[str, str]) -> None:
+    for km in KV_RE.finditer(text, pos, endpos):
+        key = km.group("key")
+        canon = SUPPORTED_KEY_MAP.get(key) or SUPPORTED_KEY_MAP.get(key.lower())
+        if canon:
+            block[canon] = km.group("value")
 
 
-def parse_ssh_config(path: Path) -> List[SshHost]:
+def parse_ssh_config(path: Path) -> Tuple[List[SshHost], bool]:
+    # Returns the parsed hosts and whether the file had any Host line at all.
+    # Only the head of the file is checked for a Host line so non-config files are never read in full.
+    with path.open("rb") as f:
+        head = f.read(SNIFF_BYTES)
+        if HOST_LINE_BYTES_RE.search(head) is None:
+            return [], False
+        text = (head + f.read()).decode("utf-8", errors="ignore")
+
+    # Tokenize with whole-text regex scans: one finditer for the Host lines, then one per block for its keys
     hosts: List[SshHost] = []
-    current_names: List[str] = []
+    matches = list(HOST_LINE_RE.finditer(text))
     current_block: Dict[str, str] = {}
-
-    def flush():
-        nonlocal current_names, current_block
-        if not current_names:
-            return
+    if matches:
+        # keys before the first Host line carry into the first block
+        _read_supported_keys(text, 0, matches[0].start(), current_block)
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        _read_supported_keys(text, m.end(), end, current_block)
         # Build SshHost for each non-wildcard name
-        for hn in current_names:
-            if any(ch in hn for ch in ("*", "?")):
+        for hn in m.group("patterns").split():
+            if "*" in hn or "?" in hn:
                 continue
             hosts.append(
                 SshHost(
@@ -125,33 +221,14 @@ def parse_ssh_config(path: Path) -> List[SshHost]:
                     identity_file=current_block.get("identityfile"),
                 )
             )
-        current_names = []
         current_block = {}
-
-    with path.open("r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            line = raw.strip("\n")
-            if not line.strip() or line.strip().startswith("#"):
-                continue
-            m = HOST_LINE_RE.match(line)
-            if m:
-                # new host block
-                flush()
-                patterns = m.group("patterns").split()
-                current_names = patterns
-                continue
-            km = KV_RE.match(line.strip())
-            if km:
-                key = km.group("key").lower()
-                val = km.group("value").strip()
-                if key in SUPPORTED_KEYS:
-                    current_block[key] = val
-    flush()
-    return hosts
+    return hosts, True
 
 
 def load_settings(settings_path: Path) -> Dict:
     if settings_path.exists():
+        if orjson is not None:
+            return orjson.loads(settings_path.read_bytes())
         with settings_path.open("r", encoding="utf-8") as f:
             return json.load(f)
     # initialize a minimal structure
@@ -164,22 +241,189 @@ def load_settings(settings_path: Path) -> Dict:
     }
 
 
-def save_settings(settings_path: Path, data: Dict, validate: bool = True, schema_url_fallback: Optional[str] = None) -> None:
-    if validate and jsonschema is not None:
+def _write_atomic(path: Path, payload: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, suffix=".tmp", delete=False) as tmp:
+        try:
+            tmp.write(payload)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    try:
+        # NamedTemporaryFile is created 0600; keep the permissions of the file being replaced
+        shutil.copymode(path, tmp.name)
+    except OSError:
+        pass
+    try:
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+
+def _get_session():
+    # One keep-alive session per process so retries and later fetches reuse the TLS connection
+    global _SESSION
+    if _SESSION is None:
+        from requests.adapters import HTTPAdapter  # type: ignore
+        from urllib3.util.retry import Retry  # type: ignore
+
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # An explicit User-Agent avoids hosts that block generic library agents
+        session.headers["User-Agent"] = f"sshToTerminal/{__version__}"
+        _SESSION = session
+    return _SESSION
+
+
+def fetch_schema(schema_url: str, cache_dir: Optional[Path] = None) -> Optional[Dict]:
+    # Schemas are cached on disk so a save does not download the full Windows Terminal schema every time
+    cache_dir = cache_dir or SCHEMA_CACHE_DIR
+    key = hashlib.sha1(schema_url.encode("utf-8")).hexdigest()
+    cache_file = cache_dir / f"{key}.json"
+    meta_file = cache_dir / f"{key}.meta.json"
+
+    cached: Optional[Dict] = None
+    try:
+        cached = json.loads(cache_file.read_bytes())
+        if time.time() - cache_file.stat().st_mtime < SCHEMA_CACHE_MAX_AGE:
+            return cached
+    except Exception:
+        cached = None
+
+    if requests is None:
+        return cached
+
+    # Stale or missing: revalidate with the server so an unchanged schema comes back as a 304
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        try:
+            meta = json.loads(meta_file.read_bytes())
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        except Exception:
+            pass
+    try:
+        resp = _get_session().get(schema_url, timeout=10, headers=headers)
+    except Exception:
+        return cached
+    if resp.status_code == 304 and cached is not None:
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        return cached
+    if not resp.ok:
+        return cached
+    try:
+        schema = resp.json()
+    except Exception:
+        return cached
+    try:
+        _write_atomic(cache_file, resp.content)
+        meta = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        _write_atomic(meta_file, json.dumps(meta).encode("utf-8"))
+    except Exception:
+        # Cache is an optimisation only; a read-only temp dir must not break saving
+        pass
+    return schema
+
+
+def get_validator(schema_url: str):
+    # Building a validator checks the schema against its metaschema, so do it once per URL
+    validator = _VALIDATOR_CACHE.get(schema_url)
+    if validator is None:
+        schema = fetch_schema(schema_url)
+        if schema is None:
+            return None
+        # imported here rather than at module level: only --strict-validate needs it, and it is slow to import
+        import jsonschema.validators  # type: ignore
+
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        validator = cls(schema)
+        _VALIDATOR_CACHE[schema_url] = validator
+    return validator
+
+
+def quick_validate(data: Dict) -> None:
+    # The structural invariants this tool relies on; cheap enough to run on every save
+    prof = data.get("profiles")
+    if not isinstance(prof, dict):
+        raise ValueError("'profiles' must be an object")
+    lst = prof.get("list")
+    if not isinstance(lst, list):
+        raise ValueError("'profiles.list' must be an array")
+    for i, p in enumerate(lst):
+        if not isinstance(p, dict):
+            raise ValueError(f"'profiles.list[{i}]' must be an object")
+        # built-in and dynamic profiles may omit these, but when present they must be strings
+        for key in ("name", "guid", "commandline"):
+            if key in p and not isinstance(p[key], str):
+                raise ValueError(f"'profiles.list[{i}].{key}' must be a string")
+
+
+def save_settings(
+    settings_path: Path,
+    data: Dict,
+    validate: bool = True,
+    schema_url_fallback: Optional[str] = None,
+    strict: bool = False,
+) -> None:
+    if validate:
+        quick_validate(data)
+    if validate and strict:
+        # Full validation against the published schema; needs jsonschema and (on a cold cache) the network
         schema_url = data.get("$schema") or schema_url_fallback
-        if schema_url and requests is not None:
+        validator = None
+        try:
+            import jsonschema  # type: ignore
+        except ImportError:
+            jsonschema = None
+            logging.warning("jsonschema is not installed; skipping strict validation")
+        if jsonschema is not None and not schema_url:
+            logging.warning("No $schema URL in settings or example.json; skipping strict validation")
+        elif jsonschema is not None:
             try:
-                resp = requests.get(schema_url, timeout=10)
-                if resp.ok:
-                    schema = resp.json()
-                    jsonschema.validate(instance=data, schema=schema)
-            except Exception:
-                # Best-effort validation
-                pass
-    settings_path.parent.mkdir(parents=True, exist_ok=True)
-    with settings_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-        f.write("\n")
+                validator = get_validator(schema_url)
+            except Exception as ex:
+                logging.warning(f"Could not load schema {schema_url}: {ex}")
+            if validator is None:
+                logging.warning(f"Schema {schema_url} unavailable; skipping strict validation")
+        if validator is not None:
+            try:
+                validator.validate(data)
+            except jsonschema.ValidationError as ex:
+                raise ValueError(f"settings do not match {schema_url}: {ex.message}") from ex
+    # The whole payload is built in memory and swapped in atomically, so a failure can never leave
+    # a truncated settings.json behind
+    buf: Optional[bytes] = None
+    if orjson is not None:
+        try:
+            buf = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates, which orjson refuses; the stdlib path below can escape them
+            buf = None
+        else:
+            # orjson only indents by 2; double it to keep the 4-space layout Windows Terminal writes.
+            # Newlines inside strings are always escaped, so every leading run of spaces is indentation.
+            buf = LEADING_SPACES_RE.sub(lambda m: m.group(1) * 2, buf)
+    if buf is None:
+        try:
+            buf = (json.dumps(data, indent=4, separators=(",", ": "), ensure_ascii=False) + "\n").encode("utf-8")
+        except UnicodeEncodeError:
+            # lone surrogates (which json.load accepts) have no UTF-8 form; escape everything instead
+            buf = (json.dumps(data, indent=4, separators=(",", ": ")) + "\n").encode("ascii")
+    # Use platform newlines, as writing in text mode did (CRLF on Windows)
+    if os.linesep != "\n":
+        buf = buf.replace(b"\n", os.linesep.encode("ascii"))
+    _write_atomic(settings_path, buf)
 
 
 def ensure_profiles_container(data: Dict) -> List[Dict]:
@@ -195,7 +439,12 @@ def ensure_profiles_container(data: Dict) -> List[Dict]:
 
 
 def upsert_profiles(profiles: List[Dict], ssh_hosts: List[SshHost], source_tag: str = "sshToTerminal") -> None:
-    by_name: Dict[str, int] = {p.get("name"): i for i, p in enumerate(profiles) if isinstance(p, dict) and p.get("name")}
+    by_name: Dict[str, int] = {}
+    for i, p in enumerate(profiles):
+        # profiles come straight from json, so an exact type check is enough (and cheaper than isinstance)
+        n = p.get("name") if type(p) is dict else None
+        if n:
+            by_name[n] = i
     for host in ssh_hosts:
         profile = {
             "name": host.name,
@@ -204,38 +453,31 @@ def upsert_profiles(profiles: List[Dict], ssh_hosts: List[SshHost], source_tag:
             "hidden": False,
             # intentionally omitting 'source' to comply with Windows Terminal auto-generated profile rules
         }
-        if host.name in by_name:
-            profiles[by_name[host.name]] = profile
+        i = by_name.get(host.name)
+        if i is not None:
+            profiles[i] = profile
         else:
+            by_name[host.name] = len(profiles)
             profiles.append(profile)
 
 
 def remove_profiles(profiles: List[Dict], ssh_hosts: List[SshHost], source_tag: str = "sshToTerminal") -> None:
-    names = {h.name for h in ssh_hosts}
-    keep: List[Dict] = []
-    for p in profiles:
-        if not isinstance(p, dict):
-            keep.append(p)
-            continue
-        n = p.get("name")
-        if n in names:
-            # drop profiles that match names from provided ssh_hosts
-            continue
-        if not names:
-            # When no specific names provided, remove profiles that look like ours.
-            # Detection heuristic: deterministic GUID derived from profile name using our namespace.
-            g = p.get("guid")
-            if isinstance(n, str) and isinstance(g, str):
-                try:
-                    expected = f"{{{SshHost(name=n).guid()}}}"
-                    if g == expected:
-                        # looks like a profile created by this tool; drop it
-                        continue
-                except Exception:
-                    pass
-        # otherwise, keep
-        keep.append(p)
-    profiles[:] = keep
+    names = frozenset(h.name for h in ssh_hosts)
+    if names:
+        # drop profiles that match names from provided ssh_hosts
+        profiles[:] = [p for p in profiles if not (isinstance(p, dict) and p.get("name") in names)]
+        return
+    # When no specific names provided, remove profiles that look like ours.
+    # Detection heuristic: deterministic GUID derived from profile name using our namespace.
+    profiles[:] = [
+        p
+        for p in profiles
+        if not (
+            isinstance(p, dict)
+            and isinstance(p.get("name"), str)
+            and p.get("guid") == f"{{{_guid_for_name(p['name'])}}}"
+        )
+    ]
 
 
 def load_schema_fallback_from_example(example_path: Optional[Path]) -> Optional[str]:
@@ -273,6 +515,9 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p.add_argument("-a", "--add", action="store_true", help="Add SSH config hosts to settings.json")
     p.add_argument("-r", "--remove", action="store_true", help="Remove SSH config hosts from settings.json")
     p.add_argument("-e", "--exclude", action="append", default=[], help="Exclude specified SSH config file names (can be given multiple times)")
+    p.add_argument("--skip-dirs", action="append", default=[], metavar="NAME", help="Do not descend into subdirectories with this name, in addition to .git, node_modules, etc. (can be given multiple times)")
+    p.add_argument("--skip-hidden", action="store_true", help="Do not descend into hidden subdirectories of the SSH directory")
+    p.add_argument("--strict-validate", action="store_true", help="Also validate settings.json against the Windows Terminal JSON schema before saving (fetches the schema)")
     return p.parse_args(argv)
 
 
@@ -289,17 +534,13 @@ def main(argv: Optional[List[str]] = None) -> int:
     settings_path = Path(args.terminal) if args.terminal else find_default_settings_path()
 
     logging.debug(f"Scanning SSH dir: {ssh_dir} (recursive={include_subdirs})")
-    files = discover_ssh_config_files(ssh_dir, include_subdirs, args.exclude)
-    logging.info(f"Found {len(files)} SSH config file(s)")
+    parsed = scan_and_parse(ssh_dir, include_subdirs, args.exclude, args.skip_dirs, args.skip_hidden)
+    logging.info(f"Found {len(parsed)} SSH config file(s)")
 
     all_hosts: List[SshHost] = []
-    for f in files:
-        try:
-            hs = parse_ssh_config(f)
-            logging.debug(f"{f}: parsed {len(hs)} host(s)")
-            all_hosts.extend(hs)
-        except Exception as ex:
-            logging.warning(f"Failed to parse {f}: {ex}")
+    for f, hs in parsed:
+        logging.debug(f"{f}: parsed {len(hs)} host(s)")
+        all_hosts.extend(hs)
 
     settings = load_settings(settings_path)
     profiles = ensure_profiles_container(settings)
@@ -311,8 +552,14 @@ def main(argv: Optional[List[str]] = None) -> int:
         upsert_profiles(profiles, all_hosts)
         logging.info("Add/update complete")
 
-    schema_fallback = load_schema_fallback_from_example(Path(__file__).with_name("example.json"))
-    save_settings(settings_path, settings, validate=True, schema_url_fallback=schema_fallback)
+    schema_fallback = None
+    if args.strict_validate:
+        schema_fallback = load_schema_fallback_from_example(Path(__file__).with_name("example.json"))
+    try:
+        save_settings(settings_path, settings, validate=True, schema_url_fallback=schema_fallback, strict=args.strict_validate)
+    except ValueError as ex:
+        logging.error(f"Not saving {settings_path}: {ex}")
+        return 1
     logging.info(f"Saved settings to {settings_path}")
     return 0
 
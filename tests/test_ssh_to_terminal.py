@@ -43,7 +43,8 @@ def write(tmp: Path, name: str, content: str) -> Path:
 
 def test_parse_ssh_config_all_fields(tmp_path: Path):
     cfg = write(tmp_path, "config", SSH_SAMPLE_ALL)
-    hosts = stt.parse_ssh_config(cfg)
+    hosts, saw_host_line = stt.parse_ssh_config(cfg)
+    assert saw_host_line
     assert len(hosts) == 1
     h = hosts[0]
     assert h.name == "Server01"
@@ -56,7 +57,8 @@ def test_parse_ssh_config_all_fields(tmp_path: Path):
 
 def test_parse_ssh_config_missing_fields(tmp_path: Path):
     cfg = write(tmp_path, "config", SSH_SAMPLE_PARTIAL)
-    hosts = stt.parse_ssh_config(cfg)
+    hosts, saw_host_line = stt.parse_ssh_config(cfg)
+    assert saw_host_line
     assert len(hosts) == 1
     h = hosts[0]
     assert h.name == "Server02"
@@ -66,7 +68,8 @@ def test_parse_ssh_config_missing_fields(tmp_path: Path):
 
 def test_parse_ssh_config_multiple_hosts_one_block(tmp_path: Path):
     cfg = write(tmp_path, "config", SSH_SAMPLE_MULTI)
-    hosts = stt.parse_ssh_config(cfg)
+    hosts, saw_host_line = stt.parse_ssh_config(cfg)
+    assert saw_host_line
     names = sorted([h.name for h in hosts])
     assert names == ["web1", "web2"]
     for h in hosts:
@@ -75,21 +78,94 @@ def test_parse_ssh_config_multiple_hosts_one_block(tmp_path: Path):
         assert h.commandline in {"ssh bob@web.example", "ssh bob@web.example"}
 
 
-def test_discover_ssh_config_files(tmp_path: Path):
+def test_parse_ssh_config_block_layouts(tmp_path: Path):
+    content = (
+        "Host one\r\n"
+        "HostName one.example\r\n"
+        "# a comment between keys\r\n"
+        "user carol\r\n"
+        "\r\n"
+        "  Host two *.wild\r\n"
+        "    Port 2200\r\n"
+    )
+    cfg = write(tmp_path, "config", content)
+    hosts, _ = stt.parse_ssh_config(cfg)
+    assert [(h.name, h.hostname, h.user, h.port) for h in hosts] == [
+        ("one", "one.example", "carol", None),
+        ("two", None, None, "2200"),
+    ]
+
+
+def test_scan_and_parse(tmp_path: Path):
     write(tmp_path, "config", SSH_SAMPLE_ALL)
     write(tmp_path, "notes.txt", "not a config")
     sub = tmp_path / "sub"
     write(sub, "cfg", SSH_SAMPLE_PARTIAL)
 
-    files_recursive = stt.discover_ssh_config_files(tmp_path, include_subdirs=True, excludes=[])
-    assert {p.name for p in files_recursive} == {"config", "cfg"}
+    parsed_recursive = stt.scan_and_parse(tmp_path, include_subdirs=True, excludes=[])
+    assert {p.name for p, _ in parsed_recursive} == {"config", "cfg"}
+    assert {h.name for _, hs in parsed_recursive for h in hs} == {"Server01", "Server02"}
 
-    files_nosub = stt.discover_ssh_config_files(tmp_path, include_subdirs=False, excludes=[])
-    assert {p.name for p in files_nosub} == {"config"}
+    parsed_nosub = stt.scan_and_parse(tmp_path, include_subdirs=False, excludes=[])
+    assert {p.name for p, _ in parsed_nosub} == {"config"}
 
-    files_excluded = stt.discover_ssh_config_files(tmp_path, include_subdirs=True, excludes=["cfg"]) \
-        
-    assert {p.name for p in files_excluded} == {"config"}
+    parsed_excluded = stt.scan_and_parse(tmp_path, include_subdirs=True, excludes=["cfg"])
+    assert {p.name for p, _ in parsed_excluded} == {"config"}
+
+    assert stt.scan_and_parse(tmp_path / "missing", include_subdirs=True, excludes=[]) == []
+
+
+def test_scan_and_parse_skips_files_that_fail(tmp_path: Path, monkeypatch):
+    for i in range(5):
+        write(tmp_path, f"cfg{i}", f"Host h{i}\n    HostName h{i}.example\n")
+    real_parse = stt.parse_ssh_config
+
+    def flaky_parse(path: Path):
+        if path.name == "cfg3":
+            raise OSError("boom")
+        return real_parse(path)
+
+    monkeypatch.setattr(stt, "parse_ssh_config", flaky_parse)
+    parsed = stt.scan_and_parse(tmp_path, include_subdirs=False, excludes=[])
+    assert sorted(p.name for p, _ in parsed) == ["cfg0", "cfg1", "cfg2", "cfg4"]
+    for p, hs in parsed:
+        assert [h.name for h in hs] == [p.name.replace("cfg", "h")]
+
+
+def test_scan_and_parse_skips_empty_and_oversized_files(tmp_path: Path, monkeypatch, caplog):
+    write(tmp_path, "config", SSH_SAMPLE_ALL)
+    write(tmp_path, "empty", "")
+    write(tmp_path, "big", SSH_SAMPLE_PARTIAL + "\n" + "#" * 200)
+    monkeypatch.setattr(stt, "MAX_CONFIG_BYTES", 150)
+
+    with caplog.at_level("DEBUG"):
+        parsed = stt.scan_and_parse(tmp_path, include_subdirs=False, excludes=[])
+    assert {p.name for p, _ in parsed} == {"config"}
+    assert "empty: skipped" in caplog.text
+    assert "big: skipped" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level("DEBUG"):
+        parsed = stt.scan_and_parse(tmp_path, include_subdirs=False, excludes=["big"])
+    assert "big: skipped" not in caplog.text
+
+
+def test_scan_and_parse_prunes_skipped_dirs(tmp_path: Path):
+    write(tmp_path, "config", SSH_SAMPLE_ALL)
+    write(tmp_path / ".git", "cfg", SSH_SAMPLE_PARTIAL)
+    write(tmp_path / ".hidden", "cfg", SSH_SAMPLE_PARTIAL)
+    write(tmp_path / "old", "cfg", SSH_SAMPLE_MULTI)
+
+    parsed = stt.scan_and_parse(tmp_path, include_subdirs=True, excludes=[])
+    assert {p.parent.name for p, _ in parsed} == {tmp_path.name, ".hidden", "old"}
+
+    parsed = stt.scan_and_parse(tmp_path, include_subdirs=True, excludes=[], skip_dirs=["old"], skip_hidden=True)
+    assert {p.parent.name for p, _ in parsed} == {tmp_path.name}
+
+
+def test_parse_ssh_config_without_host_lines(tmp_path: Path):
+    notes = write(tmp_path, "notes.txt", "not a config")
+    assert stt.parse_ssh_config(notes) == ([], False)
 
 
 def load_example_settings(project_root: Path) -> dict:
@@ -143,3 +219,194 @@ def test_remove_profiles_by_names(tmp_path: Path):
     # remove remaining via empty names: should remove any profiles created by this tool
     stt.remove_profiles(profiles, [])
     assert profiles == []
+
+
+class FakeResponse:
+    def __init__(self, payload: dict, status_code: int = 200, headers: dict = None):
+        self._payload = payload
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode("utf-8")
+
+    def json(self):
+        return self._payload
+
+
+def test_fetch_schema_uses_disk_cache(tmp_path: Path, monkeypatch):
+    calls = []
+
+    def fake_get(url, timeout=None, headers=None):
+        calls.append(headers)
+        return FakeResponse({"type": "object"}, headers={"ETag": '"abc"'})
+
+    monkeypatch.setattr(stt, "_get_session", lambda: types.SimpleNamespace(get=fake_get))
+    url = "https://example.invalid/schema.json"
+
+    assert stt.fetch_schema(url, cache_dir=tmp_path) == {"type": "object"}
+    assert stt.fetch_schema(url, cache_dir=tmp_path) == {"type": "object"}
+    assert len(calls) == 1
+
+    # once the cache is stale the request is conditional and a 304 reuses the cached copy
+    monkeypatch.setattr(stt, "SCHEMA_CACHE_MAX_AGE", -1)
+    calls.clear()
+    monkeypatch.setattr(stt, "_get_session", lambda: types.SimpleNamespace(
+        get=lambda url, timeout=None, headers=None: calls.append(headers) or FakeResponse({}, status_code=304)))
+    assert stt.fetch_schema(url, cache_dir=tmp_path) == {"type": "object"}
+    assert calls == [{"If-None-Match": '"abc"'}]
+
+
+def test_save_settings_matches_stdlib_layout(tmp_path: Path, monkeypatch):
+    pytest.importorskip("orjson")
+    project_root = Path(__file__).resolve().parents[1]
+    base = load_example_settings(project_root)
+    base["schemes"].append({"name": "Café Noir ☕"})
+
+    fast = tmp_path / "fast.json"
+    stt.save_settings(fast, base, validate=False)
+    monkeypatch.setattr(stt, "orjson", None)
+    slow = tmp_path / "slow.json"
+    stt.save_settings(slow, base, validate=False)
+
+    # compare bytes so differing line endings between the two backends would show up
+    assert fast.read_bytes() == slow.read_bytes()
+    assert "Café Noir ☕" in slow.read_text(encoding="utf-8")
+    assert stt.load_settings(fast) == base
+
+
+def test_upsert_profiles_duplicate_hosts_once():
+    profiles = []
+    h = stt.SshHost(name="A", hostname="a.example")
+    stt.upsert_profiles(profiles, [h, stt.SshHost(name="A", hostname="a2.example")])
+    assert len(profiles) == 1
+    assert profiles[0]["commandline"] == "ssh a2.example"
+
+
+def test_get_validator_is_built_once(monkeypatch):
+    pytest.importorskip("jsonschema")
+    calls = []
+    monkeypatch.setattr(stt, "_VALIDATOR_CACHE", {})
+    monkeypatch.setattr(stt, "fetch_schema", lambda url: calls.append(url) or {"type": "object"})
+
+    url = "https://example.invalid/schema.json"
+    v = stt.get_validator(url)
+    assert stt.get_validator(url) is v
+    assert calls == [url]
+    v.validate({})
+
+
+def test_find_default_settings_path_is_cached(monkeypatch):
+    monkeypatch.setattr(stt.os, "name", "posix")
+    monkeypatch.setenv("USERNAME", "alice")
+    probed = []
+    monkeypatch.setattr(stt.os.path, "exists", lambda s: probed.append(s) or False)
+    stt.find_default_settings_path.cache_clear()
+    try:
+        p = stt.find_default_settings_path()
+        assert p == Path("/mnt/c/Users/alice/AppData/Local/Packages/Microsoft.WindowsTerminal_8wekyb3d8bbwe/LocalState/settings.json")
+        assert stt.find_default_settings_path() is p
+        assert len(probed) == 2
+    finally:
+        stt.find_default_settings_path.cache_clear()
+
+
+def test_get_session_is_shared(monkeypatch):
+    pytest.importorskip("requests")
+    monkeypatch.setattr(stt, "_SESSION", None)
+    session = stt._get_session()
+    assert stt._get_session() is session
+    assert session.headers["User-Agent"] == f"sshToTerminal/{stt.__version__}"
+    assert session.get_adapter("https://aka.ms").max_retries.total == 2
+
+
+def test_remove_profiles_keeps_foreign_entries():
+    own = stt.SshHost(name="A", hostname="a.example")
+    profiles = ["not-a-dict", {"name": "A", "guid": "{00000000-0000-0000-0000-000000000000}"}]
+    stt.upsert_profiles(profiles, [stt.SshHost(name="B", hostname="b.example")])
+    profiles.append({"name": "C", "guid": f"{{{own.guid()}}}"})
+
+    stt.remove_profiles(profiles, [])
+    assert profiles == ["not-a-dict", {"name": "A", "guid": "{00000000-0000-0000-0000-000000000000}"},
+                        {"name": "C", "guid": f"{{{own.guid()}}}"}]
+
+
+def test_commandline_is_cached():
+    h = stt.SshHost(name="A", hostname="a.example", user="u")
+    assert h.commandline is h.commandline
+    assert h == stt.SshHost(name="A", hostname="a.example", user="u")
+    with pytest.raises(AttributeError):
+        h.user = "other"
+
+
+def test_quick_validate():
+    stt.quick_validate({"profiles": {"list": [{"name": "A", "guid": "{x}"}, {"source": "Windows.Terminal.Wsl"}]}})
+    for bad in ({}, {"profiles": {"list": {}}}, {"profiles": {"list": ["x"]}}, {"profiles": {"list": [{"name": 1}]}}):
+        with pytest.raises(ValueError):
+            stt.quick_validate(bad)
+
+
+def test_save_settings_refuses_invalid_structure(tmp_path: Path):
+    target = tmp_path / "settings.json"
+    with pytest.raises(ValueError):
+        stt.save_settings(target, {"profiles": {"list": [{"commandline": ["ssh"]}]}})
+    assert not target.exists()
+
+
+def test_save_settings_strict_uses_schema(tmp_path: Path, monkeypatch):
+    jsonschema = pytest.importorskip("jsonschema")
+    schema = {"type": "object", "required": ["theme"]}
+    monkeypatch.setattr(stt, "get_validator", lambda url: jsonschema.Draft7Validator(schema))
+    data = {"$schema": "https://example.invalid/schema.json", "profiles": {"list": []}}
+    target = tmp_path / "settings.json"
+
+    stt.save_settings(target, data)
+    assert target.exists()
+    with pytest.raises(ValueError):
+        stt.save_settings(target, data, strict=True)
+
+
+def test_find_default_settings_path_windows_skips_wsl_probe(monkeypatch, tmp_path: Path):
+    # swap the module's os reference rather than patching os.name globally, which would break pathlib here
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    fake_path = types.SimpleNamespace(
+        join=stt.os.path.join,
+        expanduser=stt.os.path.expanduser,
+        exists=lambda s: pytest.fail(f"unexpected probe of {s}"),
+    )
+    monkeypatch.setattr(stt, "os", types.SimpleNamespace(name="nt", environ=stt.os.environ, path=fake_path))
+    stt.find_default_settings_path.cache_clear()
+    try:
+        assert stt.find_default_settings_path() == (
+            tmp_path / "Packages" / "Microsoft.WindowsTerminal_8wekyb3d8bbwe" / "LocalState" / "settings.json"
+        )
+    finally:
+        stt.find_default_settings_path.cache_clear()
+
+
+def test_save_settings_strict_without_jsonschema(tmp_path: Path, monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "jsonschema", None)
+    target = tmp_path / "settings.json"
+    stt.save_settings(target, {"$schema": "https://example.invalid/schema.json", "profiles": {"list": []}}, strict=True)
+    assert target.exists()
+    assert "jsonschema is not installed" in caplog.text
+
+
+def test_save_settings_escapes_lone_surrogates(tmp_path: Path, monkeypatch):
+    target = tmp_path / "settings.json"
+    target.write_text("{}", encoding="utf-8")
+    data = {"profiles": {"list": []}, "schemes": [{"name": "bad \ud800"}]}
+
+    for backend in (stt.orjson, None):
+        monkeypatch.setattr(stt, "orjson", backend)
+        stt.save_settings(target, data, validate=False)
+        assert json.loads(target.read_bytes()) == data
+        assert "\\ud800" in target.read_text(encoding="ascii")
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_save_settings_strict_without_schema_url(tmp_path: Path, caplog):
+    pytest.importorskip("jsonschema")
+    target = tmp_path / "settings.json"
+    stt.save_settings(target, {"profiles": {"list": []}}, strict=True)
+    assert target.exists()
+    assert "No $schema URL" in caplog.text